@@ -1,27 +1,154 @@
-from bs4 import BeautifulSoup 
+from html import escape
 
-def clean_html_content(raw_html: str) -> str:
+from bs4 import BeautifulSoup
+
+try:
+    # Parser in C (Lexbor): molto piu' veloce di html.parser sui DOM grandi
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    # Usato in streaming (stile SAX) per le pagine molto grandi
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Tag inutili per l'IA (il contenuto di <template> non viene mai mostrato nella pagina)
+_BLACKLIST_TAGS = ("script", "style", "svg", "meta", "link", "noscript", "template")
+
+# Attributi da tenere: ID, Class, Name, Href, Type, ecc.
+# Questo riduce drasticamente i token
+_ALLOWED_ATTRS = frozenset(('id', 'class', 'name', 'href', 'type', 'placeholder', 'aria-label', 'role'))
+
+# Tag senza chiusura: non scriviamo mai </br>, </input>, ...
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'source', 'track', 'wbr'))
+
+# Oltre questa dimensione (in caratteri) la pulizia avviene in streaming
+_STREAMING_THRESHOLD = 1_000_000
+_STREAMING_CHUNK_SIZE = 64 * 1024
+
+
+def clean_html_content(raw_html: str, pretty: bool = False) -> str:
     """
     Pulisce l'HTML rimuovendo script, stili e attributi inutili
     per renderlo digeribile da un LLM.
+    Usa selectolax se installato, altrimenti BeautifulSoup.
+    Con pretty=True l'output viene indentato (utile solo per il debug).
     """
-    soup = BeautifulSoup(raw_html, "html.parser")
+    if etree is not None and not pretty and len(raw_html) > _STREAMING_THRESHOLD:
+        return clean_html_streaming(raw_html)
+    return _clean_with_tree(raw_html, pretty)
 
-    # 1. Rimuovi tag inutili per l'IA
-    for element in soup(["script", "style", "svg", "meta", "link", "noscript"]):
-        element.decompose()
 
-    # 2. Rimuovi commenti (opzionale, ma utile)
-    # (Lo fa spesso in automatico il parser, ma per sicurezza ci fidiamo del decompose sopra)
+def _clean_with_tree(raw_html: str, pretty: bool = False) -> str:
+    if LexborHTMLParser is not None and not pretty:
+        return _clean_with_selectolax(raw_html)
+    return _clean_with_bs4(raw_html, pretty)
 
-    # 3. Pulizia attributi: teniamo solo ID, Class, Name, Href e Type
-    # Questo riduce drasticamente i token
-    allowed_attrs = ['id', 'class', 'name', 'href', 'type', 'placeholder', 'aria-label', 'role']
+
+def _clean_with_selectolax(raw_html: str) -> str:
+    tree = LexborHTMLParser(raw_html)
+
+    # 1. Rimuovi tag inutili per l'IA (insieme al loro contenuto)
+    tree.strip_tags(list(_BLACKLIST_TAGS))
+
+    # 2. Pulizia attributi: il walk dell'albero avviene in C
+    if tree.root is not None:
+        for node in tree.root.traverse(include_text=False):
+            if not node.is_element_node:
+                continue
+            attrs = node.attrs
+            for attr in list(node.attributes):
+                if attr not in _ALLOWED_ATTRS:
+                    del attrs[attr]
+
+    return tree.html or ""
+
+
+def _clean_with_bs4(raw_html: str, pretty: bool = False) -> str:
+    soup = BeautifulSoup(raw_html, "html.parser")
+
+    # Un solo passaggio sull'albero: rimozione dei tag inutili e pulizia attributi
     for tag in soup.find_all(True):
-        attrs = dict(tag.attrs)
-        for attr in attrs:
-            if attr not in allowed_attrs:
+        # I discendenti di un tag gia' rimosso sono ancora nella lista: saltiamoli
+        if tag.decomposed:
+            continue
+
+        # 1. Rimuovi tag inutili per l'IA
+        if tag.name in _BLACKLIST_TAGS:
+            tag.decompose()
+            continue
+
+        # 2. Pulizia attributi: iteriamo sulle sole chiavi, senza copiare l'intero dict
+        for attr in list(tag.attrs):
+            if attr not in _ALLOWED_ATTRS:
                 del tag.attrs[attr]
 
-    # 4. Ritorna il testo formattato
-    return soup.prettify()
\ No newline at end of file
+    # 3. Ritorna l'HTML compatto: l'indentazione costa solo token
+    if pretty:
+        return soup.prettify()
+    return str(soup)
+
+
+class _CleaningTarget:
+    """
+    Target per il parser di lxml: riceve gli eventi start/end/data
+    e scrive subito l'HTML pulito, senza mai costruire l'albero.
+    """
+
+    def __init__(self):
+        self.out = []
+        # Profondita' dentro un tag della blacklist (0 = fuori)
+        self.skip_depth = 0
+
+    def start(self, tag, attrib):
+        if self.skip_depth or tag in _BLACKLIST_TAGS:
+            self.skip_depth += 1
+            return
+        out = self.out
+        out.append("<" + tag)
+        for attr, value in attrib.items():
+            if attr in _ALLOWED_ATTRS:
+                out.append(f' {attr}="{escape(value)}"')
+        out.append(">")
+
+    def end(self, tag):
+        if self.skip_depth:
+            self.skip_depth -= 1
+        elif tag not in _VOID_TAGS:
+            self.out.append(f"</{tag}>")
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.out.append(escape(data, quote=False))
+
+    # Commenti e doctype vengono tenuti, come fanno gli altri parser
+    def comment(self, text):
+        if not self.skip_depth:
+            self.out.append(f"<!--{text}-->")
+
+    def doctype(self, name, pubid, system):
+        self.out.append(f"<!DOCTYPE {name}>")
+
+    def close(self):
+        return "".join(self.out)
+
+
+def clean_html_streaming(raw_html: str) -> str:
+    """
+    Come clean_html_content, ma legge l'HTML a blocchi con un parser
+    in stile SAX: in memoria resta solo l'output, non l'albero del DOM.
+    Senza lxml (o se lxml non riesce a leggere l'input) usa il parser ad albero.
+    """
+    if etree is None or not raw_html.strip():
+        return _clean_with_tree(raw_html)
+
+    # huge_tree: senza, libxml2 scarta in silenzio testi e attributi molto lunghi
+    parser = etree.HTMLParser(target=_CleaningTarget(), huge_tree=True)
+    try:
+        for i in range(0, len(raw_html), _STREAMING_CHUNK_SIZE):
+            parser.feed(raw_html[i:i + _STREAMING_CHUNK_SIZE])
+        return parser.close()
+    except etree.LxmlError:
+        return _clean_with_tree(raw_html)
@@ -1,14 +1,37 @@
 from mcp.server.fastmcp import FastMCP
-from playwright.async_api import async_playwright
+from mcp.types import ToolAnnotations
+import asyncio
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import logging
 from contextlib import asynccontextmanager
+from functools import lru_cache
 import json
+import os
 import sys
 from helper import clean_html_content
 
 #GLOBAL VARIABLES
-HEADLESS = True  # Set to True to run browser in headless mode
-PLAYWRIGHT_SLOW_MO = 1000  # Set to a positive integer to slow down Playwright operations for debugging (in milliseconds)
+HEADLESS = os.environ.get("MCP_HEADLESS", "1") != "0"  # Set MCP_HEADLESS=0 to show the browser window for debugging
+PLAYWRIGHT_SLOW_MO = int(os.environ.get("MCP_SLOW_MO", "0"))  # Set to a positive integer to slow down Playwright operations for debugging (in milliseconds)
+# Chromium features an MCP backend never uses: turning them off saves memory and startup time
+CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-translate",
+    "--mute-audio",
+    "--disable-features=Translate",
+]
+# Skip downloading assets the agent never reads (set MCP_BLOCK_RESOURCES=0 to disable).
+# Stylesheets are kept: visibility checks in click_by_text/get_interactive_elements rely on them.
+BLOCK_RESOURCES = os.environ.get("MCP_BLOCK_RESOURCES", "1") != "0"
+BLOCKED_RESOURCE_TYPES = frozenset(("image", "font", "media"))
+NAVIGATION_TIMEOUT = 15000  # Max time to wait for the DOM of a page (in milliseconds)
+NETWORK_IDLE_TIMEOUT = 3000  # Max extra wait for late requests when visit_url is called with wait_for_idle=True (in milliseconds)
+MAX_INTERACTIVE_ELEMENTS = 200  # Cap on the elements returned by get_interactive_elements (also stated in its docstring)
+CLEAN_CACHE_SIZE = 8  # Number of cleaned pages kept in memory (same HTML -> no re-parsing)
 USER_AGENT="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
 
 # Configure logging
@@ -22,29 +45,215 @@ logger = logging.getLogger("BrowserAgent")
 
 
 
+# Page helpers injected once per document (see browser_lifespan): the tools then
+# call them with a tiny evaluate() instead of shipping and re-parsing the whole script.
+_INIT_SCRIPT = r"""
+(() => {
+    // Elements found by the last __mcp_listInteractive call, keyed by URL.
+    // A new document re-runs this script, so the cache starts empty after every navigation.
+    window.__mcp_cache = { url: null, elements: [] };
+
+    const clickQuery = 'button, a, input[type="submit"], input[type="button"], [role="button"], [onclick]';
+
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width <= 0 || rect.height <= 0) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none';
+    };
+
+    // Returns the first visible element whose text matches
+    const findByText = (elements, text, exactMatch) => {
+        const lowerText = text.toLowerCase();
+        for (const el of elements) {
+            const elementText = (el.innerText || el.value || el.getAttribute('aria-label') || '').trim();
+            const matches = exactMatch ? elementText === text : elementText.toLowerCase().includes(lowerText);
+            if (matches && isVisible(el)) return el;
+        }
+        return null;
+    };
+
+    window.__mcp_findByText = function(text, exactMatch) {
+        // 1. Fast path: reuse the last interactive elements scan of this page
+        let targetElement = null;
+        const cache = window.__mcp_cache;
+        if (cache.url === location.href) {
+            const cached = cache.elements.filter(el => el.isConnected && el.matches(clickQuery));
+            targetElement = findByText(cached, text, exactMatch);
+        }
+
+        // 2. Fall back to a full scan of the document
+        if (!targetElement) {
+            targetElement = findByText(document.querySelectorAll(clickQuery), text, exactMatch);
+        }
+
+        if (!targetElement) {
+            return { success: false, message: `No element found with text "${text}"` };
+        }
+
+        // Get element info before clicking
+        const elementInfo = {
+            tag: targetElement.tagName.toLowerCase(),
+            text: (targetElement.innerText || targetElement.value || '').substring(0, 100),
+            id: targetElement.id,
+            className: targetElement.className
+        };
+
+        // Click the element
+        targetElement.click();
+
+        return { 
+            success: true, 
+            message: `Clicked ${elementInfo.tag} with text "${elementInfo.text}"`,
+            element: elementInfo
+        };
+    };
+
+    window.__mcp_listInteractive = function(maxItems) {
+        const items = [];
+        const elements = [];
+        const seen = new Set();
+        // Query for commonly interactive elements
+        const query = 'button, a, input, select, textarea, [role="button"], [onclick]';
+        const nodes = document.querySelectorAll(query);
+        const canCheckVisibility = typeof Element.prototype.checkVisibility === 'function';
+
+        for (let i = 0; i < nodes.length && items.length < maxItems; i++) {
+            const el = nodes[i];
+            const tag = el.tagName.toLowerCase();
+
+            // 1. Filter out invisible elements without forcing a getComputedStyle per element
+            if (canCheckVisibility) {
+                if (!el.checkVisibility({checkOpacity: true, checkVisibilityCSS: true})) continue;
+            } else if (el.offsetParent === null) {
+                continue;
+            }
+            const rect = el.getBoundingClientRect();
+            if (rect.width < 1 || rect.height < 1) continue;
+
+            // 2. Build a "best guess" CSS selector
+            let selector = tag;
+            if (el.id) {
+                selector += `#${el.id}`;
+            } else if (el.className && typeof el.className === 'string' && el.className.trim() !== '') {
+                // Use the first valid class to keep the selector concise
+                selector += `.${el.className.trim().split(/\s+/)[0]}`;
+            }
+
+            // 3. Extract meaningful text (name - what the user sees)
+            let name = el.innerText || el.placeholder || el.value || el.getAttribute('aria-label') || "";
+            // Clean up whitespace and truncate long text
+            name = name.replace(/\s+/g, ' ').trim().substring(0, 100);
+
+            // Ignore empty elements unless they are form inputs
+            if (!name && tag !== 'input' && tag !== 'select' && tag !== 'textarea') continue;
+
+            // 4. Extract link (URL) if it's a link or button with href
+            let link = null;
+            if (tag === 'a' && el.href) {
+                link = el.href;
+            } else if (el.getAttribute('href')) {
+                link = el.getAttribute('href');
+            }
+
+            // 5. Skip duplicates (repeated nav links, list items...)
+            const key = name + '|' + selector + '|' + link;
+            if (seen.has(key)) continue;
+            seen.add(key);
+
+            items.push({
+                name: name,
+                selector: selector,
+                link: link
+            });
+            elements.push(el);
+        }
+
+        // Remember the scan so that a following click_by_text can skip the DOM walk
+        window.__mcp_cache = { url: location.href, elements: elements };
+        return items;
+    };
+})();
+"""
+
+# Tool entry points into the injected helpers
+_JS_CLICK_BY_TEXT = "({text, exactMatch}) => window.__mcp_findByText(text, exactMatch)"
+_JS_LIST_INTERACTIVE = "(maxItems) => window.__mcp_listInteractive(maxItems)"
+
+
+@lru_cache(maxsize=CLEAN_CACHE_SIZE)
+def _clean_html_cached(raw_html: str) -> str:
+    """Cleans the HTML, reusing the result if the page has not changed since a previous call."""
+    return clean_html_content(raw_html)
+
+
+async def _block_resources(route):
+    """Aborts requests for resource types listed in BLOCKED_RESOURCE_TYPES."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
 browser_state = {
     "playwright": None,
     "browser": None,
-    "page": None
+    "context": None,
+    "page": None,
+    "page_lock": None  # Held by the tools that change the page
 }
 
 
+@asynccontextmanager
+async def _acquire_page(exclusive: bool = True):
+    """
+    Gives a tool the shared page. Tools that change it (navigation, clicks, typing)
+    hold the lock for the whole call; read-only tools only wait for the change in
+    progress to finish, so they can run concurrently with each other.
+    """
+    page = browser_state["page"]
+    if page is None:
+        raise RuntimeError("Browser is not initialized.")
+
+    lock = browser_state["page_lock"]
+    if exclusive:
+        async with lock:
+            yield page
+    else:
+        async with lock:
+            pass
+        yield page
+
+
 @asynccontextmanager
 async def browser_lifespan(server: FastMCP):
     """Handles browser setup and teardown."""
     logger.info("Starting browser...")
     p = await async_playwright().start()
-    browser = await p.chromium.launch(headless=HEADLESS, slow_mo=PLAYWRIGHT_SLOW_MO)
-    page = await browser.new_page(
+    browser = await p.chromium.launch(
+        headless=HEADLESS,
+        slow_mo=PLAYWRIGHT_SLOW_MO,
+        args=CHROMIUM_ARGS
+    )
+    # A single context: routing and init script are registered once for all its pages
+    context = await browser.new_context(
         user_agent=USER_AGENT,
         viewport={"width": 1920, "height": 1080}
     )
+    if BLOCK_RESOURCES:
+        await context.route("**/*", _block_resources)
+    # Runs on every new document; evaluated too for the about:blank page already open
+    await context.add_init_script(_INIT_SCRIPT)
+    page = await context.new_page()
+    await page.evaluate(_INIT_SCRIPT)
     logger.info("Browser started.")
 
     # Save to global state
     browser_state["playwright"] = p
     browser_state["browser"] = browser
+    browser_state["context"] = context
     browser_state["page"] = page
+    browser_state["page_lock"] = asyncio.Lock()
     
     try:
         yield # The server runs while this is suspended
@@ -57,94 +266,96 @@ async def browser_lifespan(server: FastMCP):
 
 mcp = FastMCP("BrowserAgent", lifespan=browser_lifespan)
 
+# Tools that only read the page: clients may run them concurrently
+READ_ONLY = ToolAnnotations(readOnlyHint=True)
+
 
 @mcp.tool()
-async def visit_url(url: str) -> str:
+async def visit_url(url: str, wait_for_idle: bool = False) -> str:
     """
     Visit a URL and return the page title.
 
-    This function will block until the page has finished loading.
-    """
-    page = browser_state["page"]
-    if not page:
-        raise RuntimeError("Browser is not initialized.")
+    This function will block until the page DOM is ready.
 
-    # Log the URL we are visiting
-    logger.info(f"Visiting URL: {url}")
+    Args:
+        url: The URL to visit
+        wait_for_idle: If True, also waits (up to a few seconds) for the network to settle.
+            Only useful for pages that build their content with late requests.
+    """
+    async with _acquire_page() as page:
+        # Log the URL we are visiting
+        logger.info("Visiting URL: %s", url)
 
-    # Navigate to the URL
-    await page.goto(url)
+        # Navigate to the URL, without waiting for every subresource to load
+        await page.goto(url, wait_until="domcontentloaded", timeout=NAVIGATION_TIMEOUT)
+        if wait_for_idle:
+            try:
+                await page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_TIMEOUT)
+            except PlaywrightTimeoutError:
+                # Pages with analytics/long polling never go idle: the DOM is enough
+                pass
 
-    # Get the title of the page
-    title = await page.title()
+        # Get the title of the page
+        title = await page.title()
 
-    # Log the title of the page
-    logger.info(f"Visited {url}, title: {title}")
+        # Log the title of the page
+        logger.info("Visited %s, title: %s", url, title)
 
-    # Return the title
-    return title
+        # Return the title
+        return title
 
-@mcp.tool()
+@mcp.tool(annotations=READ_ONLY)
 async def get_page_content() -> str:
     """
     Get the cleaned HTML content of the current page.
     """
-    page = browser_state["page"]
-    if not page:
-        raise RuntimeError("Browser is not initialized.")
+    async with _acquire_page(exclusive=False) as page:
+        # Get the raw HTML content
+        raw_html = await page.content()
 
-    # Get the raw HTML content
-    raw_html = await page.content()
+        # Clean the HTML content
+        cleaned_html = _clean_html_cached(raw_html)
 
-    # Clean the HTML content
-    cleaned_html = clean_html_content(raw_html)
+        # Log the length of the cleaned content
+        logger.info("Retrieved and cleaned page content, length: %d characters", len(cleaned_html))
 
-    # Log the length of the cleaned content
-    logger.info(f"Retrieved and cleaned page content, length: {len(cleaned_html)} characters")
-
-    return cleaned_html
+        return cleaned_html
 
 @mcp.tool()
 async def fill_text(selector: str, text: str) -> None:
     """
     Fill a text input identified by the selector with the given text.
     """
-    page = browser_state["page"]
-    if not page:
-        raise RuntimeError("Browser is not initialized.")
-
     if not selector or not text:
         raise ValueError("Selector and text must be provided.")
-    
-    try:
-        # Log the action
-        logger.info(f"Filling text in selector '{selector}' with text '{text}'")
-        # Fill the text input
-        await page.fill(selector, text)
-        logger.info(f"Filled text in selector '{selector}'")
 
-    except Exception as e:
-        logger.error(f"Error filling text in selector '{selector}': {e}")
-        raise e
+    async with _acquire_page() as page:
+        try:
+            # Log the action
+            logger.info("Filling text in selector '%s' with text '%s'", selector, text)
+            # Fill the text input
+            await page.fill(selector, text)
+            logger.info("Filled text in selector '%s'", selector)
+
+        except Exception as e:
+            logger.error("Error filling text in selector '%s': %s", selector, e)
+            raise e
 
 @mcp.tool()
 async def click_element(selector: str) -> None:
     """
     Click an element identified by the selector.
     """
-    page = browser_state["page"]
-    if not page:
-        raise RuntimeError("Browser is not initialized.")
-
     if not selector:
         raise ValueError("Selector must be provided.")
 
-    try:
-        await page.click(selector)
-        logger.info(f"Clicked element with selector '{selector}'")
-    except Exception as e:
-        logger.error(f"Error clicking element with selector '{selector}': {e}")
-        raise e
+    async with _acquire_page() as page:
+        try:
+            await page.click(selector)
+            logger.info("Clicked element with selector '%s'", selector)
+        except Exception as e:
+            logger.error("Error clicking element with selector '%s': %s", selector, e)
+            raise e
 
 @mcp.tool()
 async def click_by_text(text: str, exact_match: bool = False) -> str:
@@ -162,139 +373,41 @@ async def click_by_text(text: str, exact_match: bool = False) -> str:
         - click_by_text("Login") - clicks the first element containing "Login"
         - click_by_text("Submit", exact_match=True) - clicks element with exactly "Submit"
     """
-    page = browser_state["page"]
-    if not page:
-        raise RuntimeError("Browser is not initialized.")
-
     if not text:
         raise ValueError("Text must be provided.")
 
-    try:
-        logger.info(f"Searching for element with text '{text}' (exact_match={exact_match})")
-        
-        # Execute JavaScript to find and click the element
-        result = await page.evaluate("""({text, exactMatch}) => {
-            const query = 'button, a, input[type="submit"], input[type="button"], [role="button"], [onclick]';
-            const elements = Array.from(document.querySelectorAll(query));
-            
-            // Filter visible elements
-            const visibleElements = elements.filter(el => {
-                const rect = el.getBoundingClientRect();
-                const style = window.getComputedStyle(el);
-                return rect.width > 0 && rect.height > 0 && 
-                       style.visibility !== 'hidden' && style.display !== 'none';
-            });
-            
-            // Find element by text
-            let targetElement = null;
-            for (const el of visibleElements) {
-                const elementText = (el.innerText || el.value || el.getAttribute('aria-label') || '').trim();
-                
-                if (exactMatch) {
-                    if (elementText === text) {
-                        targetElement = el;
-                        break;
-                    }
-                } else {
-                    if (elementText.toLowerCase().includes(text.toLowerCase())) {
-                        targetElement = el;
-                        break;
-                    }
-                }
-            }
-            
-            if (!targetElement) {
-                return { success: false, message: `No element found with text "${text}"` };
-            }
-            
-            // Get element info before clicking
-            const elementInfo = {
-                tag: targetElement.tagName.toLowerCase(),
-                text: (targetElement.innerText || targetElement.value || '').substring(0, 100),
-                id: targetElement.id,
-                className: targetElement.className
-            };
-            
-            // Click the element
-            targetElement.click();
-            
-            return { 
-                success: true, 
-                message: `Clicked ${elementInfo.tag} with text "${elementInfo.text}"`,
-                element: elementInfo
-            };
-        }""", {"text": text, "exactMatch": exact_match})
-        
-        if result["success"]:
-            logger.info(result["message"])
-            return result["message"]
-        else:
-            logger.error(result["message"])
-            raise RuntimeError(result["message"])
-            
-    except Exception as e:
-        logger.error(f"Error clicking element with text '{text}': {e}")
-        raise e
+    async with _acquire_page() as page:
+        try:
+            logger.info("Searching for element with text '%s' (exact_match=%s)", text, exact_match)
 
-@mcp.tool()
+            # Execute the injected helper to find and click the element
+            result = await page.evaluate(_JS_CLICK_BY_TEXT, {"text": text, "exactMatch": exact_match})
+
+            if result["success"]:
+                logger.info(result["message"])
+                return result["message"]
+            else:
+                logger.error(result["message"])
+                raise RuntimeError(result["message"])
+
+        except Exception as e:
+            logger.error("Error clicking element with text '%s': %s", text, e)
+            raise e
+
+@mcp.tool(annotations=READ_ONLY)
 async def get_interactive_elements() -> str:
     """
     Scans the current page to find interactive elements (buttons, links, inputs).
-    Returns a JSON list with name (visible text), selector (CSS selector), and link (URL if applicable).
+    Returns a compact JSON list with name (visible text), selector (CSS selector), and link (URL if applicable).
+    Duplicates are removed and the list contains at most 200 entries.
     Useful for understanding what elements are available to interact with.
     """
-    page = browser_state["page"]
-    if not page:
-        raise RuntimeError("Browser is not initialized.")
+    async with _acquire_page(exclusive=False) as page:
+        # Execute the injected helper in the browser to extract elements
+        elements = await page.evaluate(_JS_LIST_INTERACTIVE, MAX_INTERACTIVE_ELEMENTS)
 
-    # Execute JavaScript in the browser to extract elements
-    elements = await page.evaluate(r"""() => {
-        const items = [];
-        // Query for commonly interactive elements
-        const query = 'button, a, input, select, textarea, [role="button"], [onclick]';
-        
-        document.querySelectorAll(query).forEach((el) => {
-            // 1. Filter out invisible elements (zero size or hidden style)
-            const rect = el.getBoundingClientRect();
-            const style = window.getComputedStyle(el);
-            if (rect.width < 1 || rect.height < 1 || style.visibility === 'hidden' || style.display === 'none') return;
-            
-            // 2. Build a "best guess" CSS selector
-            let selector = el.tagName.toLowerCase();
-            if (el.id) {
-                selector += `#${el.id}`;
-            } else if (el.className && typeof el.className === 'string' && el.className.trim() !== '') {
-                // Use the first valid class to keep the selector concise
-                selector += `.${el.className.trim().split(/\s+/)[0]}`;
-            }
-            
-            // 3. Extract meaningful text (name - what the user sees)
-            let name = el.innerText || el.placeholder || el.value || el.getAttribute('aria-label') || "";
-            // Clean up whitespace and truncate long text
-            name = name.replace(/\\\\s+/g, ' ').trim().substring(0, 100);
-
-            // Ignore empty elements unless they are form inputs
-            if (!name && !['input', 'select', 'textarea'].includes(el.tagName.toLowerCase())) return;
-
-            // 4. Extract link (URL) if it's a link or button with href
-            let link = null;
-            if (el.tagName.toLowerCase() === 'a' && el.href) {
-                link = el.href;
-            } else if (el.getAttribute('href')) {
-                link = el.getAttribute('href');
-            }
-
-            items.push({
-                name: name,
-                selector: selector,
-                link: link
-            });
-        });
-        return items;
-    }""")
-    
-    logger.info(f"Found {len(elements)} interactive elements on the page")
-    return json.dumps(elements, indent=2)
+        logger.info("Found %d interactive elements on the page", len(elements))
+        return json.dumps(elements, separators=(",", ":"), ensure_ascii=False)
 
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
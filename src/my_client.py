@@ -1,7 +1,11 @@
 import asyncio
+import atexit
 import os
 import logging
 import sys
+from functools import partial
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
 from typing import Annotated, Any
 from typing_extensions import TypedDict
 
@@ -12,16 +16,22 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 from langchain_ollama import ChatOllama
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 from langgraph.checkpoint.memory import MemorySaver
 
 # --- LOGGING CONFIGURATION ---
+# The log file is written by a background thread, so disk I/O never blocks the event loop
+log_queue = Queue(-1)
+log_listener = QueueListener(log_queue, logging.FileHandler("agent_debug.log"))
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(sys.stdout),
-        logging.FileHandler("agent_debug.log")
+        QueueHandler(log_queue)
     ]
 )
 logger = logging.getLogger("WebNavigatorClient")
@@ -35,6 +45,81 @@ server_params = StdioServerParameters(
 class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
 
+# First positional argument of the tools, for LLMs that send {"args": [...]}
+FIRST_POSITIONAL_ARG = {
+    "visit_url": "url",
+    "click_by_text": "text",
+}
+
+def _normalize_args(tool_name: str, kwargs: dict) -> dict:
+    """Flattens the argument nesting patterns sent by some models (Qwen/Ollama)."""
+    actual_args = dict(kwargs)
+
+    # Handle specific Qwen/Ollama nesting patterns found in logs
+    if "kwargs" in actual_args and isinstance(actual_args["kwargs"], dict):
+        # Merge or replace with nested kwargs
+        inner_kwargs = actual_args.pop("kwargs")
+        actual_args.update(inner_kwargs)
+
+    if "args" in actual_args and isinstance(actual_args["args"], (list, tuple)):
+        inner_args = actual_args.pop("args")
+        # e.g. visit_url(args=["..."]) -> visit_url(url="...")
+        arg_name = FIRST_POSITIONAL_ARG.get(tool_name)
+        if inner_args and arg_name and arg_name not in actual_args:
+            actual_args[arg_name] = inner_args[0]
+
+    return actual_args
+
+async def _mcp_call(session: ClientSession, tool_name: str, /, **kwargs) -> str:
+    """Single dispatcher behind every LangChain tool: calls the tool on the MCP server."""
+    actual_args = _normalize_args(tool_name, kwargs)
+    logger.info(f"MCP Tool Call: [{tool_name}] | Final Arguments: {actual_args}")
+
+    try:
+        # Call the real MCP server
+        result = await session.call_tool(tool_name, arguments=actual_args)
+        output = result.content[0].text
+        logger.info(f"MCP Tool Response: [{tool_name}] | Length: {len(output)} chars")
+        return output
+    except Exception as e:
+        logger.error(f"Error executing {tool_name}: {str(e)}")
+        return f"Error executing tool: {str(e)}"
+
+async def _run_tool_call(tool_call: dict, tools_by_name: dict) -> ToolMessage:
+    """Executes a single tool call and wraps the result in a ToolMessage"""
+    t_name = tool_call["name"]
+    t_args = tool_call["args"]
+    t_id = tool_call["id"]
+
+    logger.info(f"Executing Tool: {t_name} | Raw Args: {t_args}")
+
+    selected_tool = tools_by_name[t_name]
+    tool_result = await selected_tool.ainvoke(t_args)
+
+    return ToolMessage(
+        content=str(tool_result),
+        name=t_name,
+        tool_call_id=t_id,
+    )
+
+async def _execute_tool_calls(tool_calls: list, tools_by_name: dict) -> list[ToolMessage]:
+    """
+    Executes the tool calls, returning the ToolMessages in the same order.
+    Consecutive read-only calls run together; the others keep their order,
+    since they change the page state seen by the following calls.
+    """
+    outputs = []
+    batch = []
+    for tool_call in tool_calls:
+        if tools_by_name[tool_call["name"]].metadata.get("concurrent_safe"):
+            batch.append(tool_call)
+            continue
+        outputs.extend(await asyncio.gather(*(_run_tool_call(tc, tools_by_name) for tc in batch)))
+        batch = []
+        outputs.append(await _run_tool_call(tool_call, tools_by_name))
+    outputs.extend(await asyncio.gather(*(_run_tool_call(tc, tools_by_name) for tc in batch)))
+    return outputs
+
 async def run_agent_loop(model_name="qwen2.5:14b"):
     logger.info(f"Starting session with model: {model_name}")
     
@@ -49,62 +134,18 @@ async def run_agent_loop(model_name="qwen2.5:14b"):
             langchain_tools = []
 
             for mcp_tool in mcp_tools_list.tools:
-                tool_name = mcp_tool.name
-                tool_description = mcp_tool.description
-                
-                # Wrapper function
-                async def dynamic_tool_func(*args, __name=tool_name, **kwargs):
-                    # --- NEW ROBUST ARGUMENT EXTRACTION ---
-                    # 1. Start with kwargs
-                    actual_args = kwargs
-                    
-                    # 2. If LLM used positional args (args: [...])
-                    if not actual_args and args:
-                        # If the tool expects a single string (like visit_url)
-                        # We try to wrap the first positional arg into a dict if needed
-                        # But typically LangChain tools should use kwargs.
-                        pass 
-
-                    # 3. Handle specific Qwen/Ollama nesting patterns found in logs
-                    if "kwargs" in actual_args and isinstance(actual_args["kwargs"], dict):
-                        # Merge or replace with nested kwargs
-                        inner_kwargs = actual_args.pop("kwargs")
-                        actual_args.update(inner_kwargs)
-                    
-                    if "args" in actual_args and isinstance(actual_args["args"], (list, tuple)):
-                        inner_args = actual_args.pop("args")
-                        if inner_args:
-                            # If it's visit_url(url="..."), the first arg is the URL
-                            if __name == "visit_url" and "url" not in actual_args:
-                                actual_args["url"] = inner_args[0]
-                            # If it's click_by_text(text="..."), the first arg is the text
-                            elif __name == "click_by_text" and "text" not in actual_args:
-                                actual_args["text"] = inner_args[0]
-
-                    # 4. Final safety check: if actual_args is empty but we have kwargs with data
-                    # (This handles the case where Qwen sends {'url': '...'} directly)
-                    # No changes needed, actual_args already has the data.
-
-                    logger.info(f"MCP Tool Call: [{__name}] | Final Arguments: {actual_args}")
-                    
-                    try:
-                        # Call the real MCP server
-                        result = await session.call_tool(__name, arguments=actual_args)
-                        output = result.content[0].text
-                        logger.info(f"MCP Tool Response: [{__name}] | Length: {len(output)} chars")
-                        return output
-                    except Exception as e:
-                        logger.error(f"Error executing {__name}: {str(e)}")
-                        return f"Error executing tool: {str(e)}"
-   
-                # Assegniamo metadati per permettere all'LLM di capire cosa fa il tool
-                dynamic_tool_func.__name__ = tool_name
-                dynamic_tool_func.__doc__ = tool_description
-                
-                # Creiamo il tool strutturato per LangChain
-                lc_tool = tool(dynamic_tool_func)
+                # The MCP input schema is passed as is, so the LLM sees the real tool arguments
+                lc_tool = StructuredTool.from_function(
+                    coroutine=partial(_mcp_call, session, mcp_tool.name),
+                    name=mcp_tool.name,
+                    description=mcp_tool.description or "",
+                    args_schema=mcp_tool.inputSchema,
+                    # Read-only tools (e.g. get_page_content) can run in parallel
+                    metadata={"concurrent_safe": bool(mcp_tool.annotations and mcp_tool.annotations.readOnlyHint)},
+                )
                 langchain_tools.append(lc_tool)
 
+            tools_by_name = {t.name: t for t in langchain_tools}
             logger.info(f"Loaded {len(langchain_tools)} tools from MCP server.")
 
             # LLM setup
@@ -120,28 +161,11 @@ async def run_agent_loop(model_name="qwen2.5:14b"):
 
             async def tool_executor(state: AgentState):
                 """Node that executes the tools"""
-                outputs = []
                 last_message = state["messages"][-1]
                 
                 logger.info(f"Agent requested {len(last_message.tool_calls)} tool(s).")
                 
-                for tool_call in last_message.tool_calls:
-                    t_name = tool_call["name"]
-                    t_args = tool_call["args"]
-                    t_id = tool_call["id"]
-                    
-                    logger.info(f"Executing Tool: {t_name} | Raw Args: {t_args}")
-                    
-                    selected_tool = next(t for t in langchain_tools if t.name == t_name)
-                    tool_result = await selected_tool.ainvoke(t_args)
-                    
-                    outputs.append(
-                        ToolMessage(
-                            content=str(tool_result),
-                            name=t_name,
-                            tool_call_id=t_id,
-                        )
-                    )
+                outputs = await _execute_tool_calls(last_message.tool_calls, tools_by_name)
                 return {"messages": outputs}
 
             # --- GRAPH CONSTRUCTION ---
@@ -0,0 +1,77 @@
+import pytest
+
+import helper
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8"><link rel="stylesheet" href="/style.css">
+  <style>body { color: red; }</style>
+  <script>document.write("<b>hidden</b>");</script>
+</head>
+<body>
+  <div id="main" class="box" style="color: blue" data-track="1" onclick="go()">
+    <a href="/login?next=1&amp;lang=it" aria-label="Login" target="_blank">Tom &amp; Jerry &lt;3</a>
+    <svg viewBox="0 0 1 1"><path d="M0 0"/></svg>
+    <noscript>Enable JavaScript</noscript>
+    <template><p class="row" data-x="1" onclick="pick()">Template row</p></template>
+    <input type="text" name="q" placeholder="Search" value="secret"><br>
+    <img src="/logo.png" alt="Logo">
+  </div>
+</body>
+</html>"""
+
+BACKENDS = [
+    pytest.param(helper._clean_with_bs4, id="bs4"),
+    pytest.param(
+        helper._clean_with_selectolax, id="selectolax",
+        marks=pytest.mark.skipif(helper.LexborHTMLParser is None, reason="selectolax not installed"),
+    ),
+    pytest.param(
+        helper.clean_html_streaming, id="streaming",
+        marks=pytest.mark.skipif(helper.etree is None, reason="lxml not installed"),
+    ),
+]
+
+
+@pytest.mark.parametrize("clean", BACKENDS)
+def test_backends_clean_the_same_way(clean):
+    cleaned = clean(PAGE)
+
+    # Blacklisted tags are removed together with their content
+    for removed in ("<script", "<style", "<svg", "<meta", "<link", "<noscript", "<template", "hidden",
+                    "Enable JavaScript", "Template row"):
+        assert removed not in cleaned
+
+    # Only the allowed attributes survive
+    for removed in ("style=", "data-track", "data-x", "onclick", "target=", "value=", "src=", "alt="):
+        assert removed not in cleaned
+    for kept in ('id="main"', 'class="box"', 'aria-label="Login"', 'type="text"', 'name="q"', 'placeholder="Search"'):
+        assert kept in cleaned
+
+    # Text, entities, void tags and the doctype are preserved
+    assert 'href="/login?next=1&amp;lang=it"' in cleaned
+    assert "Tom &amp; Jerry &lt;3" in cleaned
+    assert "<br" in cleaned and "</br>" not in cleaned
+    assert "<img" in cleaned and "</img>" not in cleaned
+    assert "<!DOCTYPE html>" in cleaned
+
+
+@pytest.mark.parametrize("clean", BACKENDS)
+def test_backends_accept_empty_input(clean):
+    assert isinstance(clean(""), str)
+
+
+def test_clean_html_content_with_installed_backend():
+    # Goes through the backend picked at import (selectolax when installed):
+    # an incompatible optional dependency must not break get_page_content
+    cleaned = helper.clean_html_content(PAGE)
+    assert 'id="main"' in cleaned
+    assert "onclick" not in cleaned
+
+
+@pytest.mark.skipif(helper.etree is None, reason="lxml not installed")
+def test_streaming_keeps_huge_attributes():
+    # Beyond libxml2's default limits (~10MB) values used to be dropped silently
+    href = "/" + "x" * 11_000_000
+    assert f'href="{href}"' in helper.clean_html_streaming(f'<a href="{href}">a</a>')
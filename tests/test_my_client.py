@@ -0,0 +1,85 @@
+import asyncio
+import importlib
+import os
+
+import pytest
+from langchain_core.tools import StructuredTool
+
+
+@pytest.fixture(scope="module")
+def my_client(tmp_path_factory):
+    # Importing the client opens agent_debug.log in the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("client"))
+    try:
+        return importlib.import_module("my_client")
+    finally:
+        os.chdir(cwd)
+
+
+def test_normalize_args_keeps_plain_arguments(my_client):
+    args = {"url": "https://example.com"}
+    assert my_client._normalize_args("visit_url", args) == {"url": "https://example.com"}
+    assert args == {"url": "https://example.com"}  # the input is not modified
+
+
+def test_normalize_args_flattens_nested_kwargs(my_client):
+    args = {"kwargs": {"selector": "#q", "text": "hello"}}
+    assert my_client._normalize_args("fill_text", args) == {"selector": "#q", "text": "hello"}
+
+
+def test_normalize_args_maps_positional_args(my_client):
+    assert my_client._normalize_args("visit_url", {"args": ["https://example.com"]}) == {"url": "https://example.com"}
+    assert my_client._normalize_args("click_by_text", {"args": ["Login"], "exact_match": True}) == {
+        "text": "Login",
+        "exact_match": True,
+    }
+
+
+def test_normalize_args_does_not_override_named_argument(my_client):
+    args = {"url": "https://a.com", "args": ["https://b.com"]}
+    assert my_client._normalize_args("visit_url", args) == {"url": "https://a.com"}
+
+
+def test_normalize_args_drops_args_of_unknown_tool(my_client):
+    assert my_client._normalize_args("get_page_content", {"args": ["ignored"]}) == {}
+    assert my_client._normalize_args("get_page_content", {"args": []}) == {}
+
+
+def test_execute_tool_calls_gathers_read_only_calls_in_order(my_client):
+    events = []
+
+    def make_tool(name, concurrent_safe):
+        async def call(**kwargs):
+            events.append(f"start {kwargs['tag']}")
+            await asyncio.sleep(0.01)
+            events.append(f"end {kwargs['tag']}")
+            return f"{name}:{kwargs['tag']}"
+
+        return StructuredTool.from_function(
+            coroutine=call,
+            name=name,
+            description=name,
+            args_schema={"type": "object", "properties": {"tag": {"type": "string"}}},
+            metadata={"concurrent_safe": concurrent_safe},
+        )
+
+    tools_by_name = {
+        "read": make_tool("read", True),
+        "write": make_tool("write", False),
+    }
+    tool_calls = [
+        {"name": "read", "args": {"tag": "r1"}, "id": "1"},
+        {"name": "read", "args": {"tag": "r2"}, "id": "2"},
+        {"name": "write", "args": {"tag": "w"}, "id": "3"},
+        {"name": "read", "args": {"tag": "r3"}, "id": "4"},
+    ]
+
+    outputs = asyncio.run(my_client._execute_tool_calls(tool_calls, tools_by_name))
+
+    # Messages follow the order of the tool calls
+    assert [m.tool_call_id for m in outputs] == ["1", "2", "3", "4"]
+    assert [m.content for m in outputs] == ["read:r1", "read:r2", "write:w", "read:r3"]
+    # The first two reads overlap; the write runs alone, before the last read
+    assert events[:2] == ["start r1", "start r2"]
+    assert events[2:] == ["end r1", "end r2", "start w", "end w", "start r3", "end r3"]